@@ -3,7 +3,7 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any, AsyncIterator, Optional
 from loguru import logger
 
-@dataclass
+@dataclass(slots=True)
 class LLMResult:
     """Standardized response object for blocking calls."""
     text: str
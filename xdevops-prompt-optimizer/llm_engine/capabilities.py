@@ -1,7 +1,8 @@
 import os
-import math
+import re
 import tiktoken
-from typing import Set, Dict
+from functools import lru_cache
+from typing import Set, Dict, Optional, Tuple
 from loguru import logger
 
 # --- Configuration Constants ---
@@ -25,16 +26,31 @@ DEFAULT_CONTEXT_WINDOWS = {
 
 # Heuristic divisor for non-OpenAI models (conservative estimate)
 TOKEN_ESTIMATION_DIVISOR = 3.5
+# Same divisor as an exact integer ratio (3.5 -> 7/2) for integer ceil division
+_DIVISOR_NUM, _DIVISOR_DEN = TOKEN_ESTIMATION_DIVISOR.as_integer_ratio()
 
+# Model names that should be counted with tiktoken (gpt, o1, o3, o4)
+_OPENAI_MODEL_PATTERN = re.compile(r"gpt|o[134]")
+
+# Encoding used for OpenAI-family models unknown to the installed tiktoken
+FALLBACK_ENCODING = "cl100k_base"
+
+# Texts longer than this (in characters) bypass the token-count cache,
+# so a few huge documents cannot pin large amounts of memory.
+TOKEN_CACHE_MAX_TEXT_LEN = 16_384
+
+@lru_cache(maxsize=1)
 def _get_reasoning_overrides() -> Set[str]:
     """
     Parses the REASONING_MODEL_OVERRIDES environment variable.
+    Cached: the env is read once per process (see invalidate()).
     """
     raw = os.getenv("REASONING_MODEL_OVERRIDES", "")
     if not raw:
         return set()
     return {m.strip().lower() for m in raw.split(",") if m.strip()}
 
+@lru_cache(maxsize=256)
 def is_reasoning_model(model: str) -> bool:
     """
     Determines if a model requires 'max_completion_tokens' (Reasoning) 
@@ -48,9 +64,10 @@ def is_reasoning_model(model: str) -> bool:
     if model_lower in overrides:
         return True
         
-    # 2. Check standard prefixes
-    return any(model_lower.startswith(p) for p in DEFAULT_REASONING_PREFIXES)
+    # 2. Check standard prefixes (str.startswith accepts the whole tuple)
+    return model_lower.startswith(DEFAULT_REASONING_PREFIXES)
 
+@lru_cache(maxsize=256)
 def json_mode_strategy(model: str) -> str:
     """
     Returns 'api' (response_format) or 'prompt' (injection) strategy.
@@ -59,6 +76,7 @@ def json_mode_strategy(model: str) -> str:
         return "prompt"
     return "api"
 
+@lru_cache(maxsize=256)
 def get_context_window(model: str) -> int:
     """
     Returns the total context window size for a model.
@@ -69,21 +87,94 @@ def get_context_window(model: str) -> int:
     model_lower = model.lower().strip()
     return DEFAULT_CONTEXT_WINDOWS.get(model_lower, DEFAULT_CONTEXT_WINDOWS["default"])
 
-def compute_max_output_tokens(model: str) -> int:
+@lru_cache(maxsize=1)
+def _reply_cap_params() -> Tuple[float, int, int]:
     """
-    Calculates the dynamic output token limit based on context size.
-    Logic strictly mirrors bot.py: _refine_scope_gen -> compute_reply_cap
+    Parses REPLY_CAP_PCT / REPLY_CAP_MIN / REPLY_CAP_MAX once per process.
     """
-    ctx_limit = get_context_window(model)
-    
     # Defaults match bot.py
     pct = float(os.getenv("REPLY_CAP_PCT", "0.08")) 
     cap_min = int(os.getenv("REPLY_CAP_MIN", "1200"))
     cap_max = int(os.getenv("REPLY_CAP_MAX", "6000"))
+    return pct, cap_min, cap_max
+
+def compute_max_output_tokens(model: str) -> int:
+    """
+    Calculates the dynamic output token limit based on context size.
+    Logic strictly mirrors bot.py: _refine_scope_gen -> compute_reply_cap
+    """
+    ctx_limit = get_context_window(model)
+    pct, cap_min, cap_max = _reply_cap_params()
     
     calculated = int(ctx_limit * pct)
     return max(cap_min, min(cap_max, calculated))
 
+def invalidate() -> None:
+    """
+    Clears the memoized model lookups and env settings (e.g. after changing
+    REASONING_MODEL_OVERRIDES or REPLY_CAP_* at runtime or between tests).
+    """
+    _get_reasoning_overrides.cache_clear()
+    _reply_cap_params.cache_clear()
+    is_reasoning_model.cache_clear()
+    json_mode_strategy.cache_clear()
+    get_context_window.cache_clear()
+
+@lru_cache(maxsize=1)
+def _get_fallback_encoder() -> Optional[tiktoken.Encoding]:
+    """
+    Loads cl100k_base (standard for GPT-4/3.5/o1) once per process.
+    A failure (e.g. BPE file unavailable offline) is cached as None too,
+    so it is not retried for every unknown model name.
+    """
+    try:
+        return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        logger.warning(f"Tiktoken fallback encoding '{FALLBACK_ENCODING}' unavailable: {e}")
+        return None
+
+@lru_cache(maxsize=32)
+def _get_encoder(model: str) -> Optional[tiktoken.Encoding]:
+    """
+    Resolves (and caches) the tiktoken encoding for a model.
+    Unknown models (KeyError misses) are cached as the fallback encoding,
+    so repeated calls for them are a single dict hit.
+    Returns None if no encoding could be loaded at all.
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Model unknown to this version of tiktoken, try generic fallback
+        pass
+    except Exception as e:
+        logger.warning(f"Tiktoken error for model '{model}': {e}")
+
+    return _get_fallback_encoder()
+
+@lru_cache(maxsize=4096)
+def _cached_encode_len(text: str, encoding_name: str) -> int:
+    """
+    Token count of a text for a given encoding, memoized so repeated
+    estimates of the same message (e.g. truncation loops) encode once.
+    """
+    enc = tiktoken.get_encoding(encoding_name)
+    return len(enc.encode_ordinary(text))
+
+def get_encoder(model: str) -> Optional[tiktoken.Encoding]:
+    """
+    Returns the (cached) tiktoken encoding used to count tokens for a model,
+    or None when the model is counted with the character heuristic instead.
+    """
+    if not model:
+        return None
+    model_lower = model.lower()
+    
+    # Attempt Tiktoken (OpenAI Standard)
+    # Checks for gpt, o1, o3, o4 to try specific encoding
+    if not _OPENAI_MODEL_PATTERN.search(model_lower):
+        return None
+    return _get_encoder(model_lower)
+
 def estimate_tokens(text: str, model: str) -> int:
     """
     Centralized token budget estimation.
@@ -92,30 +183,17 @@ def estimate_tokens(text: str, model: str) -> int:
     if not text:
         return 0
     
-    model_lower = model.lower()
-    
-    # Attempt Tiktoken (OpenAI Standard)
-    # Checks for gpt, o1, o3, o4 to try specific encoding
-    if any(k in model_lower for k in ("gpt", "o1", "o3", "o4")):
-        try:
-            enc = tiktoken.encoding_for_model(model)
-            # disallowed_special=() prevents crashes on special tokens like <|endoftext|>
-            return len(enc.encode(text, disallowed_special=()))
-        except KeyError:
-            # Model unknown to this version of tiktoken, try generic fallback
-            pass
-        except Exception as e:
-            logger.warning(f"Tiktoken error for model '{model}': {e}")
-
-        # Fallback to cl100k_base (standard for GPT-4/3.5/o1)
-        try:
-            enc = tiktoken.get_encoding("cl100k_base")
-            return len(enc.encode(text, disallowed_special=()))
-        except Exception:
-            pass
+    enc = get_encoder(model)
+    if enc is not None:
+        if len(text) <= TOKEN_CACHE_MAX_TEXT_LEN:
+            return _cached_encode_len(text, enc.name)
+        # encode_ordinary treats special tokens like <|endoftext|> as plain text
+        # (same ids as encode(disallowed_special=()), without the special-token scan)
+        return len(enc.encode_ordinary(text))
     
     # Ultimate Fallback: Conservative Heuristic
-    return math.ceil(len(text) / TOKEN_ESTIMATION_DIVISOR)
+    # ceil(len / divisor) in integer arithmetic
+    return -(-len(text) * _DIVISOR_DEN // _DIVISOR_NUM)
 
 def build_json_system_instructions() -> str:
     """
@@ -1,13 +1,19 @@
 import os
+from functools import lru_cache
 from loguru import logger
 from .base import AbstractLLMClient
 # Import from the providers package, ensuring decoupling
 from .providers import OpenAIClient, GeminiClient, DeepSeekClient
 
+@lru_cache(maxsize=1)
 def get_llm_client() -> AbstractLLMClient:
     """
     Factory function to instantiate the correct LLM provider based on environment config.
     
+    The client is created once per process and shared by every caller, so its
+    HTTP connection pool is reused. Treat it as long-lived; use reset_llm_client()
+    to force a new instance (e.g. after changing env vars or in tests).
+    
     Env Vars:
         LLM_PROVIDER: "openai" (default), "gemini", or "deepseek".
         OPENAI_API_KEY: Required for 'openai'.
@@ -52,4 +58,11 @@ def get_llm_client() -> AbstractLLMClient:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError(f"Unknown provider '{provider}' and fallback OPENAI_API_KEY is missing.")
-        return OpenAIClient(api_key=api_key)
\ No newline at end of file
+        return OpenAIClient(api_key=api_key)
+
+def reset_llm_client() -> None:
+    """
+    Drops the cached client so the next get_llm_client() call re-reads the env.
+    Does not close the previous client; callers owning it should close() it first.
+    """
+    get_llm_client.cache_clear()
\ No newline at end of file
@@ -1,6 +1,10 @@
 from typing import List, Dict, AsyncIterator, Optional, Any
 from loguru import logger
 from ..base import AbstractLLMClient, LLMResult, LLMFatalError
+from ..streaming import batch_chunks, DEFAULT_MIN_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE, DEFAULT_BATCH_GROWTH_FACTOR, DEFAULT_MAX_BATCH_DELAY
+
+# Pre-uppercased labels for the standard roles used in _convert_history
+_ROLE_LABELS = {"user": "USER", "assistant": "ASSISTANT", "system": "SYSTEM"}
 
 class GeminiClient(AbstractLLMClient):
     def __init__(self, api_key: str):
@@ -38,7 +42,17 @@ class GeminiClient(AbstractLLMClient):
             logger.error(f"Gemini Generate Error: {e}")
             raise LLMFatalError(str(e))
 
-    async def stream(self, messages: List[Dict[str, str]], model: str, **kwargs) -> AsyncIterator[str]:
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        *,
+        min_batch_size: int = DEFAULT_MIN_BATCH_SIZE,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_size_growth_factor: int = DEFAULT_BATCH_GROWTH_FACTOR,
+        max_batch_delay: float = DEFAULT_MAX_BATCH_DELAY,
+        **kwargs
+    ) -> AsyncIterator[str]:
         gemini_model = self.genai.GenerativeModel(model)
         chat = self._convert_history(messages)
         
@@ -53,18 +67,27 @@ class GeminiClient(AbstractLLMClient):
                 generation_config=config if config else None
             )
             
-            async for chunk in response_stream:
-                if chunk.text:
-                    yield chunk.text
+            async for text in batch_chunks(
+                self._iter_text(response_stream),
+                min_batch_size=min_batch_size,
+                max_batch_size=max_batch_size,
+                growth_factor=batch_size_growth_factor,
+                max_delay=max_batch_delay,
+            ):
+                yield text
         except Exception as e:
             logger.error(f"Gemini Stream Error: {e}")
             raise LLMFatalError(str(e))
 
+    @staticmethod
+    async def _iter_text(response_stream) -> AsyncIterator[str]:
+        async for chunk in response_stream:
+            if chunk.text:
+                yield chunk.text
+
     def _convert_history(self, messages: List[Dict[str, str]]) -> str:
-        # Simple string conversion
-        prompt = ""
-        for m in messages:
-            role = m["role"].upper()
-            content = m["content"]
-            prompt += f"{role}: {content}\n"
-        return prompt
\ No newline at end of file
+        # Simple string conversion (single join, linear in history length)
+        return "".join(
+            f"{_ROLE_LABELS.get(m['role']) or m['role'].upper()}: {m['content']}\n"
+            for m in messages
+        )
\ No newline at end of file
@@ -1,36 +1,85 @@
 # llm_engine/providers/openai.py
 
 import os
+import importlib.util
 from typing import List, Dict, AsyncIterator, Optional, Any
 from loguru import logger
 
+# Bound once at import time so the request path doesn't re-resolve the SDK.
+# The package stays importable without 'openai' (e.g. Gemini-only setups);
+# OpenAIClient raises a helpful ImportError when constructed in that case.
+try:
+    import httpx
+    from openai import (
+        AsyncOpenAI,
+        DefaultAsyncHttpxClient,
+        RateLimitError,
+        APITimeoutError,
+        APIConnectionError,
+        InternalServerError,
+        AuthenticationError,
+        BadRequestError,
+    )
+except ImportError:
+    AsyncOpenAI = None
+
 # Relative imports to access the base/capabilities from the parent package
 from ..base import AbstractLLMClient, LLMResult, LLMTransientError, LLMFatalError
 from ..capabilities import is_reasoning_model, build_json_system_instructions
+from ..streaming import batch_chunks, DEFAULT_MIN_BATCH_SIZE, DEFAULT_MAX_BATCH_SIZE, DEFAULT_BATCH_GROWTH_FACTOR, DEFAULT_MAX_BATCH_DELAY
+
+# Connection pool sizing for the shared HTTP client (one per OpenAIClient)
+HTTP_MAX_CONNECTIONS = 100
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 50
+# Fail fast on connect, but leave reads generous: non-streamed completions
+# send nothing until the whole answer is generated.
+HTTP_CONNECT_TIMEOUT = 5.0
+HTTP_READ_TIMEOUT = 600.0
+
+# HTTP/2 multiplexes concurrent requests over one TLS connection,
+# but httpx only supports it when the optional 'h2' package is installed.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
 
 class OpenAIClient(AbstractLLMClient):
     def __init__(self, api_key: str, base_url: Optional[str] = None):
-        try:
-            from openai import AsyncOpenAI
-        except ImportError:
+        if AsyncOpenAI is None:
             raise ImportError("openai package is required. Install via 'pip install openai'")
         
-        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+        http_client = DefaultAsyncHttpxClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        # Retries are owned by the caller (LLMTransientError + MAX_RETRIES):
+        # SDK retries on top would multiply the attempts and the backoff
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
 
     def _consolidate_system_messages(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
         """
         For O-series (reasoning) models which usually strictly enforce 'user' and 'assistant' roles,
         this merges the system prompt into the first User message.
         """
-        system_text = " ".join(m["content"] for m in messages if m["role"] == "system")
-        # Filter out system messages
-        new_messages = [m.copy() for m in messages if m["role"] != "system"]
+        # Single pass: collect system texts, keep other messages by reference.
+        # Only the message we actually modify is copied.
+        system_parts = []
+        new_messages = []
+        for m in messages:
+            if m["role"] == "system":
+                system_parts.append(m["content"])
+            else:
+                new_messages.append(m)
+        system_text = " ".join(system_parts)
         
         if system_text:
             if new_messages and new_messages[0]["role"] == "user":
                 # Prepend to the first user message
-                existing = new_messages[0]["content"] or ""
-                new_messages[0]["content"] = f"System Instruction:\n{system_text}\n\nUser Query:\n{existing}"
+                first = new_messages[0].copy()
+                existing = first["content"] or ""
+                first["content"] = f"System Instruction:\n{system_text}\n\nUser Query:\n{existing}"
+                new_messages[0] = first
             else:
                 # If no user message exists or first msg is assistant, insert new user message
                 new_messages.insert(0, {"role": "user", "content": system_text})
@@ -45,13 +94,12 @@ class OpenAIClient(AbstractLLMClient):
         if not messages:
             return messages
         
-        msgs_copy = [m.copy() for m in messages]
         instruction = build_json_system_instructions()
         
         # Append to the very last message to ensure it's fresh in context
-        last_msg = msgs_copy[-1]
+        last_msg = messages[-1].copy()
         last_msg["content"] = (last_msg.get("content") or "") + "\n\n" + instruction
-        return msgs_copy
+        return messages[:-1] + [last_msg]
 
     def _prepare_request_params(
         self, 
@@ -126,8 +174,6 @@ class OpenAIClient(AbstractLLMClient):
         temperature: Optional[float] = None, 
         **kwargs
     ) -> LLMResult:
-        import openai
-
         # Prepare parameters centrally
         params = self._prepare_request_params(
             messages, model, json_mode, max_output_tokens, temperature, kwargs
@@ -141,19 +187,27 @@ class OpenAIClient(AbstractLLMClient):
                 text=choice.message.content or "",
                 finish_reason=choice.finish_reason,
                 model=response.model,
-                usage=dict(response.usage) if response.usage else {}
+                usage=response.usage.model_dump() if response.usage else {}
             )
 
-        except openai.RateLimitError as e:
+        except RateLimitError as e:
             logger.warning(f"OpenAI Rate Limit: {e}")
             raise LLMTransientError(f"Rate limit exceeded: {e}") from e
-        except openai.APIConnectionError as e:
+        except APITimeoutError as e:
+            # Subclass of APIConnectionError: caught first for a clearer message
+            logger.warning(f"OpenAI Timeout: {e}")
+            raise LLMTransientError(f"Request timed out: {e}") from e
+        except APIConnectionError as e:
             logger.warning(f"OpenAI Connection Error: {e}")
             raise LLMTransientError(f"Connection failed: {e}") from e
-        except openai.AuthenticationError as e:
+        except InternalServerError as e:
+            # 5xx (500, 502, 503...): server-side and usually temporary
+            logger.warning(f"OpenAI Server Error: {e}")
+            raise LLMTransientError(f"Server error: {e}") from e
+        except AuthenticationError as e:
             logger.error(f"OpenAI Auth Error: {e}")
             raise LLMFatalError(f"Authentication failed: {e}") from e
-        except openai.BadRequestError as e:
+        except BadRequestError as e:
             # Catch 400 errors (like invalid params) as Fatal
             logger.error(f"OpenAI Bad Request: {e}")
             raise LLMFatalError(f"Bad request: {e}") from e
@@ -169,8 +223,18 @@ class OpenAIClient(AbstractLLMClient):
         json_mode: bool = False,
         max_output_tokens: Optional[int] = None,
         temperature: Optional[float] = None,
+        min_batch_size: int = DEFAULT_MIN_BATCH_SIZE,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_size_growth_factor: int = DEFAULT_BATCH_GROWTH_FACTOR,
+        max_batch_delay: float = DEFAULT_MAX_BATCH_DELAY,
+        raise_errors: bool = False,
         **kwargs
     ) -> AsyncIterator[str]:
+        """
+        Streams the reply text. Errors are yielded as an in-band " [Error: ...]"
+        chunk by default; with raise_errors they propagate instead, for
+        consumers that parse the text and must not mistake an error for content.
+        """
         
         # Prepare parameters centrally
         params = self._prepare_request_params(
@@ -178,19 +242,40 @@ class OpenAIClient(AbstractLLMClient):
         )
         params["stream"] = True
 
+        stream = None
         try:
             stream = await self.client.chat.completions.create(**params)
-            async for chunk in stream:
-                if chunk.choices:
-                    delta = chunk.choices[0].delta
-                    content = delta.content
-                    if content:
-                        yield content
+            # Deltas are coalesced into growing batches to amortize per-yield overhead
+            async for text in batch_chunks(
+                self._iter_deltas(stream),
+                min_batch_size=min_batch_size,
+                max_batch_size=max_batch_size,
+                growth_factor=batch_size_growth_factor,
+                max_delay=max_batch_delay,
+            ):
+                yield text
                         
         except Exception as e:
             logger.error(f"OpenAI Stream Error: {e}")
+            if raise_errors:
+                raise
             # For streams, we often yield the error text so the UI sees it immediately
             yield f" [Error: {str(e)}]"
+        finally:
+            # Closing the response also aborts generation when the consumer stops early
+            if stream is not None:
+                await stream.close()
+
+    @staticmethod
+    async def _iter_deltas(stream) -> AsyncIterator[str]:
+        """Yields the non-empty content deltas of a chat completion stream."""
+        async for chunk in stream:
+            # Read each pydantic attribute once per chunk
+            choices = chunk.choices
+            if choices:
+                content = choices[0].delta.content
+                if content:
+                    yield content
 
     async def close(self):
         await self.client.close()
@@ -0,0 +1,76 @@
+import asyncio
+from typing import AsyncIterator
+
+# Dynamic batching defaults: the first chunk is forwarded on its own (keeps
+# time-to-first-token), then each batch grows by the factor up to the cap.
+DEFAULT_MIN_BATCH_SIZE = 1
+DEFAULT_MAX_BATCH_SIZE = 50
+DEFAULT_BATCH_GROWTH_FACTOR = 3
+# Longest time (seconds) a delta may sit in the buffer before it is flushed,
+# so slow streams are not held back waiting for a batch to fill up
+DEFAULT_MAX_BATCH_DELAY = 0.05
+
+async def batch_chunks(
+    chunks: AsyncIterator[str],
+    *,
+    min_batch_size: int = DEFAULT_MIN_BATCH_SIZE,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    growth_factor: int = DEFAULT_BATCH_GROWTH_FACTOR,
+    max_delay: float = DEFAULT_MAX_BATCH_DELAY,
+) -> AsyncIterator[str]:
+    """
+    Coalesces a stream of text deltas into progressively larger chunks,
+    so consumers see far fewer yields at steady-state streaming rates.
+
+    Buffered text is always flushed: once the oldest buffered delta has waited
+    max_delay, at the end of the stream, and before an exception from the
+    source stream is propagated. The time bound waits on a single pending
+    __anext__() with asyncio.wait, which (unlike wait_for) never cancels the
+    source stream on timeout.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer = []
+    batch_size = max(1, min_batch_size)
+    deadline = 0.0
+    pending = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            if buffer:
+                done, _ = await asyncio.wait({pending}, timeout=max(0.0, deadline - loop.time()))
+                if not done:
+                    # Source is slow: flush what we have, keep the same batch size
+                    yield "".join(buffer)
+                    buffer = []
+                    continue
+
+            try:
+                chunk = await pending
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+
+            buffer.append(chunk)
+            if len(buffer) == 1:
+                deadline = loop.time() + max_delay
+            if len(buffer) >= batch_size:
+                yield "".join(buffer)
+                buffer = []
+                batch_size = min(max_batch_size, batch_size * growth_factor)
+    except Exception:
+        if buffer:
+            yield "".join(buffer)
+            buffer = []
+        raise
+    finally:
+        # Consumer stopped early (aclose / cancellation): don't leave the read running
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+    if buffer:
+        yield "".join(buffer)
@@ -1,14 +1,33 @@
-import json
 import random
 import os
-from typing import List, Dict, Tuple
+import fast_json
+from typing import Any, List, Dict, Tuple
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Dataset:
     train_set: List[Dict]
     test_set: List[Dict]
 
+@dataclass(slots=True)
+class EvalSet:
+    """
+    Column-oriented view of a split for the evaluation loop: parallel lists
+    indexed by test case, built once instead of digging through item dicts.
+    """
+    inputs: List[str]
+    expected: List[Any]
+
+    def __len__(self) -> int:
+        return len(self.inputs)
+
+    @classmethod
+    def from_items(cls, items: List[Dict]) -> "EvalSet":
+        return cls(
+            inputs=[item["conversation"][-1]["content"] for item in items],
+            expected=[item["_expected_parsed"] for item in items],
+        )
+
 class AssessmentLoader:
     def __init__(self, filepath: str):
         self.filepath = filepath
@@ -22,56 +41,66 @@ class AssessmentLoader:
             raise FileNotFoundError(f"Assessment file not found at: {self.filepath}")
 
         try:
-            with open(self.filepath, 'r', encoding='utf-8') as f:
-                self.raw_data = json.load(f)
-        except json.JSONDecodeError:
+            # Read raw bytes: orjson parses UTF-8 directly without a decode step
+            with open(self.filepath, 'rb') as f:
+                data = fast_json.loads(f.read())
+        except fast_json.JSONDecodeError:
             raise ValueError(f"Assessment file at {self.filepath} is not valid JSON.")
 
-        self._validate_structure()
+        if not isinstance(data, list):
+            raise ValueError("Assessment file must be a JSON list of objects.")
 
-    def _validate_structure(self) -> None:
+        # Validate while collecting, so the data is traversed only once
+        self.raw_data = []
+        for index, item in enumerate(data):
+            self._validate_item(index, item)
+            self.raw_data.append(item)
+
+    @staticmethod
+    def _validate_item(index: int, item: Dict) -> None:
         """
-        Ensures every entry has the required keys.
+        Ensures an entry has the required keys and stores the parsed
+        expected JSON under '_expected_parsed'.
         """
-        if not isinstance(self.raw_data, list):
-            raise ValueError("Assessment file must be a JSON list of objects.")
+        if "conversation" not in item:
+            raise ValueError(f"Item at index {index} missing required key: 'conversation'")
+        if "expected_json" not in item:
+            raise ValueError(f"Item at index {index} missing required key: 'expected_json'")
 
-        for index, item in enumerate(self.raw_data):
-            if "conversation" not in item:
-                raise ValueError(f"Item at index {index} missing required key: 'conversation'")
-            if "expected_json" not in item:
-                raise ValueError(f"Item at index {index} missing required key: 'expected_json'")
-            
-            # Ensure expected_json is a string or dict
-            if isinstance(item["expected_json"], str):
-                try:
-                    json.loads(item["expected_json"])
-                except json.JSONDecodeError:
-                    raise ValueError(f"Item at index {index} has invalid JSON string in 'expected_json'")
+        # Ensure expected_json is a string or dict
+        expected = item["expected_json"]
+        if isinstance(expected, str):
+            try:
+                expected = fast_json.loads(expected)
+            except fast_json.JSONDecodeError:
+                raise ValueError(f"Item at index {index} has invalid JSON string in 'expected_json'")
+
+        # Keep the parsed form so downstream consumers never re-parse it
+        item["_expected_parsed"] = expected
 
     def split_data(self, train_ratio: float = 0.8, seed: int = 42) -> Dataset:
         """
         Shuffles and splits the data into Training and Test sets.
         Uses a fixed seed for reproducibility.
+        Both sets are returned as lists: every caller needs their sizes and
+        re-reads them (EvalSet columns, one pass per optimization iteration).
         """
         if not self.raw_data:
             raise ValueError("Data not loaded. Call load() first.")
 
-        data_copy = self.raw_data.copy()
-        
-        # Deterministic shuffle
-        random.seed(seed)
-        random.shuffle(data_copy)
+        # Deterministic shuffle of indices (same permutation as shuffling the
+        # list itself) on a private RNG, so raw_data is neither copied nor
+        # reordered and the global random state is left untouched.
+        order = list(range(len(self.raw_data)))
+        random.Random(seed).shuffle(order)
 
-        split_index = int(len(data_copy) * train_ratio)
-        
-        train_set = data_copy[:split_index]
-        test_set = data_copy[split_index:]
+        split_index = int(len(order) * train_ratio)
 
         # Safety fallback for very small datasets
-        if len(data_copy) > 1 and (not train_set or not test_set):
-            mid = len(data_copy) // 2
-            train_set = data_copy[:mid]
-            test_set = data_copy[mid:]
+        if len(order) > 1 and (split_index == 0 or split_index == len(order)):
+            split_index = len(order) // 2
+
+        train_set = [self.raw_data[i] for i in order[:split_index]]
+        test_set = [self.raw_data[i] for i in order[split_index:]]
 
         return Dataset(train_set=train_set, test_set=test_set)
\ No newline at end of file
@@ -21,6 +21,9 @@ class Config:
     
     # Minimum token reduction required to accept a change
     SCORE_THRESHOLD = float(os.getenv("SCORE_THRESHOLD", "0.100"))
+    # Phase 2 candidates must save at least this many input tokens to be evaluated
+    # at all (0 = evaluate every candidate that could still beat the threshold)
+    MIN_TOKEN_DELTA = int(os.getenv("MIN_TOKEN_DELTA", "0"))
     
     # --- Optimization Hyperparameters ---
     # How many iterations to wait without improvement before stopping
@@ -33,6 +36,24 @@ class Config:
     # Beta: Penalty per token (0.01 = 100 tokens cost 1.0 score point)
     BETA_TOKEN_PENALTY = float(os.getenv("BETA_TOKEN_PENALTY", "0.01"))
     
+    # --- Evaluation Throughput ---
+    # Max in-flight validation requests (tune to the provider's rate-limit tier)
+    MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "20"))
+    # Row marshaling: test cases packed into one validation request.
+    # 1 = one request per test case (default). Higher values cut request count
+    # but evaluate the prompt in a batched setting unlike production usage.
+    ROW_MARSHAL_K = int(os.getenv("ROW_MARSHAL_K", "1"))
+    # Retries for transient LLM errors (rate limits, timeouts), with exponential backoff
+    MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
+    RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "1.0"))
+    RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "30.0"))
+    # Stream validation replies and abort as soon as the top-level keys
+    # already rule out a match (saves output tokens on failing cases)
+    STREAM_EARLY_EXIT = os.getenv("STREAM_EARLY_EXIT", "false").lower() == "true"
+    # Validation replies kept for reuse when the exact same prompt is evaluated
+    # again (e.g. the Expert re-proposing an earlier candidate). 0 disables it.
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+    
     # --- LLM Temperatures ---
     TEMPERATURE_VALIDATOR = float(os.getenv("TEMPERATURE_VALIDATOR", "0.0"))
     TEMPERATURE_ARCHITECT = float(os.getenv("TEMPERATURE_ARCHITECT", "0.1"))
@@ -46,6 +67,8 @@ class Config:
     ASSESSMENT_PATH = ASSETS_DIR + "/assessment.json"
     META_PROMPT_PATH = ASSETS_DIR + "/meta_prompt.txt"
     META_PROMPT_EFFICIENCY_PATH = ASSETS_DIR + "/meta_prompt_efficiency.txt"
+    VALIDATION_RULES_PATH = ASSETS_DIR + "/validation_rules.json"
+    OPTIMIZATION_LOG_PATH = OUTPUT_DIR + "/optimization.log"
     
     @staticmethod
     def validate():
@@ -0,0 +1,49 @@
+import json
+from typing import Any, Optional, Union
+
+# orjson is optional and faster, but it does not match the stdlib exactly:
+# - loads rejects NaN, Infinity and out-of-range floats (e.g. 1e400), which
+#   json.loads accepts; loads() retries those documents with the stdlib
+# - loads parses integers beyond 64 bits as floats (10**25 -> 1e+25), and
+#   the validator's float tolerance then treats close large integers as equal
+# - dumps writes 1e16 as "1e16" (stdlib: "1e+16") and NaN as null (stdlib: NaN)
+# Both backends dump compact text with ensure_ascii off (unlike json.dumps'
+# defaults), which changes the token counts of dumped outputs and prompts.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers can
+# keep catching the stdlib exception regardless of the backend in use.
+JSONDecodeError = json.JSONDecodeError
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Parses a JSON document from str or bytes.
+    Documents orjson rejects are retried with the stdlib (see above), so model
+    output parses the same with or without orjson; genuinely invalid JSON
+    still raises JSONDecodeError.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """
+    Serializes to a JSON str: compact by default, or pretty-printed with indent.
+    Both backends produce the same text (UTF-8, no spaces after separators),
+    except for the float forms listed above.
+    """
+    if orjson is not None and indent in (None, 2):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits: let the stdlib handle them
+            pass
+    if indent is None:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(obj, indent=indent, ensure_ascii=False)
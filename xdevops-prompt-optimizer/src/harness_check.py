@@ -1,13 +1,12 @@
-import json
 import os
+import fast_json
 from validator import Validator
 from assessment_loader import AssessmentLoader
+from config import Config
 
-# Configuration paths
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ASSETS_DIR = os.path.join(BASE_DIR, "..", "assets")
-ASSESSMENT_FILE = os.path.join(ASSETS_DIR, "assessment.json")
-SYSTEM_PROMPT_FILE = os.path.join(ASSETS_DIR, "system_prompt.json")
+# Configuration paths (shared with the optimizer, honours ASSETS_DIR)
+ASSESSMENT_FILE = Config.ASSESSMENT_PATH
+SYSTEM_PROMPT_FILE = Config.SYSTEM_PROMPT_PATH
 
 def run_integrity_check():
     print("--- Starting Harness Integrity Check ---")
@@ -20,14 +19,14 @@ def run_integrity_check():
     
     try:
         with open(SYSTEM_PROMPT_FILE, 'r', encoding='utf-8') as f:
-            prompt_data = json.load(f)
+            prompt_data = fast_json.loads(f.read())
             print("PASS: System prompt is valid JSON.")
             # Basic schema check
             if "system_prompt" in prompt_data:
                 print("PASS: Found 'system_prompt' root key.")
             else:
                 print("WARN: Root key 'system_prompt' missing.")
-    except json.JSONDecodeError as e:
+    except fast_json.JSONDecodeError as e:
         print(f"FAIL: System prompt JSON error: {e}")
         return
 
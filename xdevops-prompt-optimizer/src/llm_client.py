@@ -1,15 +1,19 @@
-import json
+import asyncio
+import hashlib
 import logging
+import random
 import sys
 import os
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from typing import Dict, Any, AsyncIterator, List, Optional
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import Config first to ensure .env is loaded before llm_engine initializes
 from config import Config
-from llm_engine.factory import get_llm_client
-from llm_engine.base import LLMTransientError, LLMFatalError
+from llm_engine.factory import get_llm_client, reset_llm_client
+from llm_engine.base import LLMResult, LLMTransientError, LLMFatalError
+import fast_json
 
 # Configure simple logging
 logging.basicConfig(level=logging.INFO)
@@ -17,19 +21,41 @@ logger = logging.getLogger("LLMClient")
 
 class AsyncLLMClient:
     def __init__(self):
+        # Process-wide provider client: one HTTP connection pool shared by
+        # the Orchestrator, Architect and EfficiencyExpert
         self.client = get_llm_client()
+        # Exact-match cache of parsed replies for calls made with cache=True
+        self._response_cache = OrderedDict()
+
+    async def aclose(self) -> None:
+        """
+        Closes the shared provider client and its HTTP session.
+        A later AsyncLLMClient() will build a fresh one.
+        """
+        await self.client.close()
+        reset_llm_client()
 
     async def generate_response(
         self, 
         system_prompt: str, 
         user_message: str, 
         model: str = Config.MODEL_SMART,
-        temperature: float = 0.2
+        temperature: float = 0.2,
+        cache: bool = False
     ) -> Dict[str, Any]:
         """
         Generates a JSON response from the LLM.
         Delegates to llm_engine for model normalization (O-series vs GPT-4).
+        With cache=True, a successful reply is reused for later calls with the
+        exact same prompt, message, model and temperature.
         """
+        cache_key = None
+        if cache and Config.RESPONSE_CACHE_SIZE > 0:
+            cache_key = self._cache_key(system_prompt, user_message, model, temperature)
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                self._response_cache.move_to_end(cache_key)
+                return cached
         
         messages = [
             {"role": "system", "content": system_prompt},
@@ -37,18 +63,7 @@ class AsyncLLMClient:
         ]
 
         try:
-            # llm_engine handles:
-            # 1. Consolidating system messages for reasoning models
-            # 2. Mapping max_output_tokens to max_tokens vs max_completion_tokens
-            # 3. Ignoring temperature for reasoning models
-            result = await self.client.generate(
-                messages=messages,
-                model=model,
-                json_mode=True,
-                temperature=temperature,
-                # We omit max_output_tokens to let the model/API use its default limits.
-                # This ensures compatibility with future models (e.g. o3, gpt-5) without code changes.
-            )
+            result = await self._generate_with_retry(messages, model, temperature)
             
             if result.finish_reason == "length":
                 logger.error("LLM response truncated (finish_reason='length').")
@@ -60,9 +75,15 @@ class AsyncLLMClient:
             if not result.text:
                 return {"error": "Empty response from LLM."}
 
-            return json.loads(result.text)
+            parsed = fast_json.loads(result.text)
+            if cache_key is not None:
+                # Only successful replies are cached: errors stay retryable
+                self._response_cache[cache_key] = parsed
+                if len(self._response_cache) > Config.RESPONSE_CACHE_SIZE:
+                    self._response_cache.popitem(last=False)
+            return parsed
 
-        except json.JSONDecodeError:
+        except fast_json.JSONDecodeError:
             return {"error": "Failed to parse JSON output from LLM."}
         except LLMTransientError as e:
             logger.warning(f"Transient LLM Error: {e}")
@@ -72,4 +93,93 @@ class AsyncLLMClient:
             return {"error": f"Fatal Error: {str(e)}"}
         except Exception as e:
             logger.error(f"Unexpected Error: {e}")
-            return {"error": f"Unexpected Error: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Unexpected Error: {str(e)}"}
+
+    async def generate_response_stream(
+        self,
+        system_prompt: str,
+        user_message: str,
+        model: str = Config.MODEL_SMART,
+        temperature: float = 0.2
+    ) -> AsyncIterator[str]:
+        """
+        Streams the raw text of a JSON response, chunk by chunk.
+        Each delta is forwarded as it arrives (no batching) so the consumer can
+        react to partial text, and provider errors raise instead of arriving
+        as text. Closing the iterator early aborts the underlying request.
+        """
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+        stream = self.client.stream(
+            messages=messages,
+            model=model,
+            json_mode=True,
+            temperature=temperature,
+            max_batch_size=1,
+            raise_errors=True,
+        )
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+    async def generate_batch_response(
+        self,
+        system_prompt: str,
+        user_messages: List[str],
+        model: str = Config.MODEL_SMART,
+        temperature: float = 0.2,
+        cache: bool = False
+    ) -> Optional[List[Any]]:
+        """
+        Answers several user messages with a single LLM call (row marshaling).
+        Returns one parsed JSON output per message, in order, or None if the
+        reply is an error or does not contain exactly one output per message.
+        """
+        batch_message = (
+            f"Process each of the {len(user_messages)} user inputs below independently, "
+            "exactly as if each had been sent alone under the system instructions.\n"
+            'Return a JSON object of the form {"responses": [...]} where responses[i] '
+            "is the complete JSON output for input i, in the same order.\n\n"
+            f"INPUTS:\n{fast_json.dumps(user_messages)}"
+        )
+        response = await self.generate_response(system_prompt, batch_message, model=model, temperature=temperature, cache=cache)
+
+        responses = response.get("responses") if isinstance(response, dict) else None
+        if not isinstance(responses, list) or len(responses) != len(user_messages):
+            return None
+        return responses
+
+    @staticmethod
+    def _cache_key(system_prompt: str, user_message: str, model: str, temperature: float) -> str:
+        raw = "\x00".join((system_prompt, user_message, model, str(temperature)))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    async def _generate_with_retry(self, messages: List[Dict[str, str]], model: str, temperature: float) -> LLMResult:
+        """
+        Calls the provider, retrying transient failures (rate limits, timeouts)
+        with exponential backoff plus jitter. Re-raises after the last attempt.
+        """
+        for attempt in range(Config.MAX_RETRIES + 1):
+            try:
+                # llm_engine handles:
+                # 1. Consolidating system messages for reasoning models
+                # 2. Mapping max_output_tokens to max_tokens vs max_completion_tokens
+                # 3. Ignoring temperature for reasoning models
+                return await self.client.generate(
+                    messages=messages,
+                    model=model,
+                    json_mode=True,
+                    temperature=temperature,
+                    # We omit max_output_tokens to let the model/API use its default limits.
+                    # This ensures compatibility with future models (e.g. o3, gpt-5) without code changes.
+                )
+            except LLMTransientError as e:
+                if attempt >= Config.MAX_RETRIES:
+                    raise
+                delay = min(Config.RETRY_BACKOFF_BASE * (2 ** attempt), Config.RETRY_BACKOFF_MAX) + random.random()
+                logger.warning(f"Transient LLM Error (attempt {attempt + 1}/{Config.MAX_RETRIES + 1}): {e}. Retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
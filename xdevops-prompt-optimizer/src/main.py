@@ -1,5 +1,5 @@
 import asyncio
-import json
+import hashlib
 import os
 import logging
 import sys
@@ -8,13 +8,14 @@ import sys
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
-from typing import List, Dict, Tuple
+from typing import Any, List, Dict, Set, Tuple
 from datetime import datetime
 
 # Component Imports
 from config import Config
-from assessment_loader import AssessmentLoader
-from validator import Validator, ValidationResult
+import fast_json
+from assessment_loader import AssessmentLoader, EvalSet
+from validator import Validator, StreamingKeyCheck
 from metrics import MetricsEngine
 from llm_client import AsyncLLMClient
 from optimizer import Architect, EfficiencyExpert
@@ -27,12 +28,36 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
-        logging.FileHandler(os.path.join(Config.OUTPUT_DIR, "optimization.log")),
+        logging.FileHandler(Config.OPTIMIZATION_LOG_PATH),
         logging.StreamHandler()
     ]
 )
 logger = logging.getLogger("GoProOrchestrator")
 
+LOG_SEPARATOR = "-" * 50
+
+# Max characters of a logged JSON payload before it is truncated
+LOG_PREVIEW_CHARS = 400
+
+class _LazyJson:
+    """
+    Defers JSON serialization of a log argument until a handler formats it.
+    With preview=True, large payloads are logged as a short hash + length +
+    truncated text (enough to identify the test case without the full dump).
+    """
+    __slots__ = ("obj", "preview")
+
+    def __init__(self, obj, preview: bool = False):
+        self.obj = obj
+        self.preview = preview
+
+    def __str__(self) -> str:
+        text = fast_json.dumps(self.obj)
+        if not self.preview or len(text) <= LOG_PREVIEW_CHARS:
+            return text
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:8]
+        return f"[sha1={digest} len={len(text)}] {text[:LOG_PREVIEW_CHARS]}..."
+
 class Orchestrator:
     def __init__(self):
         self.config = Config()
@@ -48,40 +73,76 @@ class Orchestrator:
         # State
         self.best_prompt = ""
         self.dataset = None
+        self.train_eval = None
+        self.test_eval = None
+
+    @property
+    def best_prompt(self) -> str:
+        return self._best_prompt
+
+    @best_prompt.setter
+    def best_prompt(self, prompt: str) -> None:
+        # Invalidate the cached token count only when the prompt is replaced
+        self._best_prompt = prompt
+        self._best_prompt_tokens = None
+
+    @property
+    def best_prompt_tokens(self) -> int:
+        """Token count of the current best prompt, computed once per prompt."""
+        if self._best_prompt_tokens is None:
+            self._best_prompt_tokens = self.metrics.count_tokens(self._best_prompt)
+        return self._best_prompt_tokens
 
     async def initialize(self):
         """Loads data and initial system prompt."""
         logger.info("--- Initializing GoPro Optimizer ---")
 
-        # 1. Load Validation Rules (Dynamic Configuration)
-        validation_config_path = os.path.join(Config.ASSETS_DIR, "validation_rules.json")
-        unordered_paths = set()
-        
-        if os.path.exists(validation_config_path):
-            try:
-                with open(validation_config_path, "r") as f:
-                    rules = json.load(f)
-                    unordered_paths = set(rules.get("unordered_paths", []))
-                logger.info(f"Loaded {len(unordered_paths)} unordered validation paths.")
-            except Exception as e:
-                logger.warning(f"Failed to load validation rules: {e}")
+        # The three file loads are independent blocking I/O: run them
+        # concurrently on worker threads instead of stalling the event loop
+        unordered_paths, _, initial_prompt = await asyncio.gather(
+            # 1. Load Validation Rules (Dynamic Configuration)
+            asyncio.to_thread(self._load_unordered_paths, Config.VALIDATION_RULES_PATH),
+            # 2. Load Assessment Data
+            asyncio.to_thread(self.loader.load),
+            # 3. Load Initial Prompt
+            asyncio.to_thread(self._read_system_prompt, Config.SYSTEM_PROMPT_PATH),
+        )
         
         # INJECT the config into the Validator
         self.validator = Validator(unordered_paths=unordered_paths)
         
-        # 2. Load and Split Data
-        self.loader.load()
+        # Split Data
         self.dataset = self.loader.split_data(train_ratio=0.8)
         logger.info(f"Data Loaded: {len(self.dataset.train_set)} Training / {len(self.dataset.test_set)} Holdout")
+
+        # Precompute the per-case fields read on every evaluation pass
+        self.train_eval = EvalSet.from_items(self.dataset.train_set)
+        self.test_eval = EvalSet.from_items(self.dataset.test_set)
         
-        # 3. Load Initial Prompt
-        if not os.path.exists(Config.SYSTEM_PROMPT_PATH):
-            raise FileNotFoundError(f"System prompt not found at {Config.SYSTEM_PROMPT_PATH}")
-        
-        with open(Config.SYSTEM_PROMPT_PATH, 'r', encoding='utf-8') as f:
-            self.best_prompt = f.read()
-            
-        logger.info(f"Initial Prompt Size: {self.metrics.count_tokens(self.best_prompt)} tokens")
+        self.best_prompt = initial_prompt
+        logger.info(f"Initial Prompt Size: {self.best_prompt_tokens} tokens")
+
+    @staticmethod
+    def _load_unordered_paths(path: str) -> Set[str]:
+        """Reads the unordered validation paths; a missing or broken file means none."""
+        if not os.path.exists(path):
+            return set()
+        try:
+            with open(path, "rb") as f:
+                rules = fast_json.loads(f.read())
+            unordered_paths = set(rules.get("unordered_paths", []))
+            logger.info(f"Loaded {len(unordered_paths)} unordered validation paths.")
+            return unordered_paths
+        except Exception as e:
+            logger.warning(f"Failed to load validation rules: {e}")
+            return set()
+
+    @staticmethod
+    def _read_system_prompt(path: str) -> str:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"System prompt not found at {path}")
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
 
     def _save_result(self, filename="system_prompt_optimized.json"):
         """Helper to save the current best prompt to disk."""
@@ -92,81 +153,142 @@ class Orchestrator:
             filepath = os.path.join(Config.OUTPUT_DIR, final_filename)
             with open(filepath, "w", encoding='utf-8') as f:
                 f.write(self.best_prompt)
-            current_tokens = self.metrics.count_tokens(self.best_prompt)
-            logger.info(f"Saved best prompt to '{filepath}' ({current_tokens} tokens).")
+            logger.info(f"Saved best prompt to '{filepath}' ({self.best_prompt_tokens} tokens).")
         except Exception as e:
             logger.error(f"Failed to save result: {e}")
 
-    def evaluate_batch(self, prompt: str, data: List[Dict]) -> Tuple[float, List[Dict], float]:
+    async def _evaluate_batch_async(self, prompt: str, data: EvalSet) -> Tuple[float, List[Dict], float]:
         """
         Runs the Validator against a specific dataset (Train or Test).
         Returns: (Accuracy 0.0-1.0, List of Failure Logs, Avg Output Tokens)
         """
-        return asyncio.run(self._evaluate_batch_async(prompt, data)) 
-
-    async def _evaluate_batch_async(self, prompt: str, data: List[Dict]) -> Tuple[float, List[Dict], float]:
         failures = []
         passed_count = 0
-        total_valid_tokens = 0
-        
-        # We process in small batches to avoid Rate Limits
-        BATCH_SIZE = 5
+        # Serialized valid outputs, tokenized in a single batch at the end
+        valid_texts = []
         
-        for i in range(0, len(data), BATCH_SIZE):
-            batch = data[i:i+BATCH_SIZE]
-            tasks = []
-            
-            # 1. Dispatch Batch Requests
-            for item in batch:
-                tasks.append(self.llm_client.generate_response(
+        # Bounded concurrency (to respect Rate Limits): a new request starts
+        # as soon as any in-flight one finishes, so slow calls don't stall a window
+        semaphore = asyncio.Semaphore(Config.MAX_CONCURRENCY)
+
+        async def _run_one(index: int) -> Tuple[int, Dict]:
+            async with semaphore:
+                if Config.STREAM_EARLY_EXIT and isinstance(data.expected[index], dict):
+                    response = await self._stream_response(prompt, data.inputs[index], data.expected[index])
+                else:
+                    response = await self.llm_client.generate_response(
+                        system_prompt=prompt,
+                        user_message=data.inputs[index],
+                        model=Config.MODEL_FAST,
+                        temperature=Config.TEMPERATURE_VALIDATOR,
+                        cache=True
+                    )
+            return index, response
+
+        async def _run_group(group: range) -> List[Tuple[int, Dict]]:
+            if len(group) == 1:
+                return [await _run_one(group[0])]
+
+            # Row marshaling: one request answers the whole group
+            async with semaphore:
+                responses = await self.llm_client.generate_batch_response(
                     system_prompt=prompt,
-                    user_message=item['conversation'][-1]['content'],
+                    user_messages=[data.inputs[i] for i in group],
                     model=Config.MODEL_FAST,
-                    temperature=Config.TEMPERATURE_VALIDATOR
-                ))
-            
-            # 2. Await Results
-            results = await asyncio.gather(*tasks)
-            
-            # 3. Validate & Log
-            for idx, (item, actual_response) in enumerate(zip(batch, results)):
-                # Parse expected JSON safely
-                expected = item['expected_json']
-                if isinstance(expected, str):
-                    try:
-                        expected = json.loads(expected)
-                    except:
-                        logger.error(f"DATA ERROR: Could not parse expected JSON for item {i+idx}")
+                    temperature=Config.TEMPERATURE_VALIDATOR,
+                    cache=True
+                )
+            if responses is None:
+                logger.warning(f"Row-marshaled reply unusable for {len(group)} items. Falling back to single requests.")
+                return await asyncio.gather(*(_run_one(i) for i in group))
+            return list(zip(group, responses))
+
+        group_size = max(1, Config.ROW_MARSHAL_K)
+        tasks = [
+            asyncio.create_task(_run_group(range(start, min(start + group_size, len(data)))))
+            for start in range(0, len(data), group_size)
+        ]
+        
+        # Validate & Log results as they complete
+        for next_done in asyncio.as_completed(tasks):
+            for i, actual_response in await next_done:
+                # Parsed once at load time
+                expected = data.expected[i]
 
                 # Run Validator
                 validation = self.validator.validate(actual_response, expected)
                 
                 if validation.passed:
                     passed_count += 1
-                    total_valid_tokens += self.metrics.count_tokens(json.dumps(actual_response))
+                    valid_texts.append(fast_json.dumps(actual_response))
                 else:
-                    logger.warning(f"\n[FAILURE DETECTED] Test Case #{i + idx + 1}")
-                    logger.warning(f"INPUT:    {item['conversation'][-1]['content']}")
-                    logger.warning(f"EXPECTED: {json.dumps(expected)}")
-                    logger.warning(f"ACTUAL:   {json.dumps(actual_response)}")
-                    logger.warning(f"REASON:   {validation.error_message}")
-                    logger.warning("-" * 50)
-
-                    failures.append({
-                        "input": item['conversation'][-1]['content'],
+                    # %-style args: serialization only happens if WARNING is emitted
+                    logger.warning("\n[FAILURE DETECTED] Test Case #%d", i + 1)
+                    logger.warning("INPUT:    %s", data.inputs[i])
+                    logger.warning("EXPECTED: %s", _LazyJson(expected, preview=True))
+                    logger.warning("ACTUAL:   %s", _LazyJson(actual_response))
+                    logger.warning("REASON:   %s", validation.error_message)
+                    logger.warning(LOG_SEPARATOR)
+
+                    failures.append((i, {
+                        "input": data.inputs[i],
                         "expected": expected,
                         "actual": actual_response,
                         "error_message": validation.error_message
-                    })
+                    }))
+
+        # Completion order is arbitrary; report failures in dataset order
+        failures = [failure for _, failure in sorted(failures, key=lambda entry: entry[0])]
 
         # Calculate average output tokens for valid responses
         avg_output_tokens = 0.0
         if passed_count > 0:
+            total_valid_tokens = self.metrics.count_tokens_batch(valid_texts)
             avg_output_tokens = total_valid_tokens / passed_count
 
-        accuracy = passed_count / len(data) if data else 0.0
+        accuracy = passed_count / len(data) if len(data) else 0.0
         return accuracy, failures, avg_output_tokens
 
+    async def _stream_response(self, prompt: str, user_message: str, expected: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Streams one validation reply, aborting the request as soon as its
+        top-level keys already rule out a match. Provider errors (raised by the
+        stream, never fed to the key check) and replies that cannot be parsed
+        are retried with a regular request, so streaming never turns a
+        transient error into a failure.
+        """
+        key_check = StreamingKeyCheck(expected.keys())
+        chunks = []
+        stream = self.llm_client.generate_response_stream(
+            system_prompt=prompt,
+            user_message=user_message,
+            model=Config.MODEL_FAST,
+            temperature=Config.TEMPERATURE_VALIDATOR
+        )
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                mismatch = key_check.feed(chunk)
+                if mismatch:
+                    # Closing the stream (finally) cancels the remaining generation
+                    return {"error": f"Stopped early: {mismatch}", "raw_content": "".join(chunks)}
+        except Exception as e:
+            logger.warning(f"Streaming failed ({e}). Retrying without streaming.")
+        else:
+            try:
+                return fast_json.loads("".join(chunks))
+            except fast_json.JSONDecodeError:
+                pass
+        finally:
+            await stream.aclose()
+
+        return await self.llm_client.generate_response(
+            system_prompt=prompt,
+            user_message=user_message,
+            model=Config.MODEL_FAST,
+            temperature=Config.TEMPERATURE_VALIDATOR
+        )
+
     async def run_pipeline(self):
         try:
             await self.initialize()
@@ -179,12 +301,17 @@ class Orchestrator:
             current_accuracy = 0.0
             avg_output_tokens = 0.0
             
+            # Evaluation of the current best prompt; None means it must be (re)computed
+            evaluation = None
+            
             while True:
                 iteration += 1
                 logger.info(f"Phase 1 - Iteration {iteration}")
                 
-                # Test against Training Set
-                accuracy, failures, avg_out = await self._evaluate_batch_async(self.best_prompt, self.dataset.train_set)
+                # Test against Training Set (only when the prompt actually changed)
+                if evaluation is None:
+                    evaluation = await self._evaluate_batch_async(self.best_prompt, self.train_eval)
+                accuracy, failures, avg_out = evaluation
                 logger.info(f"Accuracy: {accuracy:.1%} ({len(failures)} failures)")
                 
                 current_accuracy = accuracy
@@ -200,13 +327,21 @@ class Orchestrator:
                     
                 # Invoke Architect
                 logger.info("Requesting repairs from Architect...")
-                self.best_prompt = await self.architect.repair_prompt(self.best_prompt, failures)
+                repaired_prompt = await self.architect.repair_prompt(self.best_prompt, failures)
+                
+                if repaired_prompt == self.best_prompt:
+                    # The Architect falls back to the input prompt on errors;
+                    # re-running the whole batch on it would only repeat the last result
+                    logger.warning("Architect returned the prompt unchanged. Reusing previous evaluation.")
+                else:
+                    self.best_prompt = repaired_prompt
+                    evaluation = None
 
             # --- PHASE 2: THE EFFICIENCY EXPERT (COMPRESSION) ---
             logger.info("\n=== PHASE 2: EFFICIENCY EXPERT (Compression Loop) ===")
             
             # Baseline metrics
-            input_tokens = self.metrics.count_tokens(self.best_prompt)
+            input_tokens = self.best_prompt_tokens
             
             # Total "Cost" Metric: Input + (Output * 2) to weight generation latency higher? 
             # For now, let's just sum them as "Total Transaction Tokens"
@@ -221,9 +356,21 @@ class Orchestrator:
                 # Invoke Efficiency Expert
                 candidate_prompt = await self.expert.optimize_prompt(self.best_prompt)
                 candidate_input_tokens = self.metrics.count_tokens(candidate_prompt)
+
+                # Cheap rejection before paying for a full evaluation: even with 100%
+                # accuracy and no output tokens at all, the candidate must beat the threshold
+                best_case_diff = self.metrics.calculate_pareto_score(1.0, candidate_input_tokens) - current_score
+                if best_case_diff <= Config.SCORE_THRESHOLD:
+                    logger.warning(f"Candidate skipped. Best-case score diff {best_case_diff:.4f} <= Threshold {Config.SCORE_THRESHOLD} ({candidate_input_tokens} input tokens).")
+                    patience_counter += 1
+                    continue
+                if Config.MIN_TOKEN_DELTA > 0 and candidate_input_tokens > input_tokens - Config.MIN_TOKEN_DELTA:
+                    logger.warning(f"Candidate skipped. Too similar: {candidate_input_tokens} input tokens vs {input_tokens} (MIN_TOKEN_DELTA={Config.MIN_TOKEN_DELTA}).")
+                    patience_counter += 1
+                    continue
                 
                 # Validate Candidate
-                accuracy, failures, cand_avg_out = await self._evaluate_batch_async(candidate_prompt, self.dataset.train_set)
+                accuracy, failures, cand_avg_out = await self._evaluate_batch_async(candidate_prompt, self.train_eval)
                 
                 candidate_total_tokens = candidate_input_tokens + cand_avg_out
                 candidate_score = self.metrics.calculate_pareto_score(accuracy, candidate_total_tokens)
@@ -251,7 +398,7 @@ class Orchestrator:
             # --- PHASE 3: THE GATEKEEPER (HOLDOUT TEST) ---
             logger.info("\n=== PHASE 3: GATEKEEPER (Final Validation) ===")
             
-            test_accuracy, test_failures, _ = await self._evaluate_batch_async(self.best_prompt, self.dataset.test_set)
+            test_accuracy, test_failures, _ = await self._evaluate_batch_async(self.best_prompt, self.test_eval)
             
             logger.info(f"Final Test Set Accuracy: {test_accuracy:.1%}")
             
@@ -270,7 +417,16 @@ class Orchestrator:
             self._save_result()
         except Exception as e:
             logger.error(f"Orchestrator encountered a critical error: {e}")
+        finally:
+            await self.llm_client.aclose()
 
 if __name__ == "__main__":
+    # uvloop is optional (not available on Windows): faster event loop when installed
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
     orchestrator = Orchestrator()
     asyncio.run(orchestrator.run_pipeline())
\ No newline at end of file
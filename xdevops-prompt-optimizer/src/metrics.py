@@ -1,6 +1,7 @@
 import time
 from dataclasses import dataclass
-from llm_engine.capabilities import estimate_tokens
+from typing import List
+from llm_engine.capabilities import estimate_tokens, get_encoder, _cached_encode_len, TOKEN_CACHE_MAX_TEXT_LEN
 from config import Config
 
 @dataclass
@@ -13,16 +14,36 @@ class RunMetrics:
 class MetricsEngine:
     def __init__(self, model_name: str = Config.MODEL_SMART):
         self.model_name = model_name
+        # Resolved once: None means the model is counted with the character heuristic
+        self._encoder = get_encoder(model_name)
         self.alpha = Config.ALPHA_ACCURACY
         self.beta = Config.BETA_TOKEN_PENALTY
 
     def count_tokens(self, text: str) -> int:
         """
         Returns the precise BPE token count for a string.
+        Memoized per text in the capabilities token cache (same size guard as
+        estimate_tokens): prompts and validated outputs repeat a lot across
+        optimization iterations.
         """
         if not text:
             return 0
-        return estimate_tokens(text, self.model_name)
+        encoder = self._encoder
+        if encoder is None:
+            return estimate_tokens(text, self.model_name)
+        if len(text) <= TOKEN_CACHE_MAX_TEXT_LEN:
+            return _cached_encode_len(text, encoder.name)
+        return len(encoder.encode_ordinary(text))
+
+    def count_tokens_batch(self, texts: List[str]) -> int:
+        """
+        Returns the total BPE token count of many strings.
+        Per-text counts: they share the token cache, and the batches here
+        (one validated output per test case) are too small for a threaded
+        batch encode to pay off.
+        """
+        count_tokens = self.count_tokens
+        return sum(count_tokens(text) for text in texts)
 
     def calculate_pareto_score(self, accuracy: float, token_count: int) -> float:
         """
@@ -1,8 +1,8 @@
-import json
 from typing import List, Dict
 from llm_client import AsyncLLMClient
 from templates import MetaPrompts
 from config import Config
+import fast_json
 
 class Architect:
     def __init__(self, llm_client: AsyncLLMClient):
@@ -43,7 +43,7 @@ class Architect:
 
         try:
             if isinstance(response, dict):
-                 return json.dumps(response, indent=2)
+                 return fast_json.dumps(response, indent=2)
             else:
                  return str(response)
         except Exception as e:
@@ -65,7 +65,7 @@ class Architect:
                 f"- Failure #{i+1}: "
                 f"Input='{safe_input}', "
                 f"Error='{safe_error}', "
-                f"Actual Output={json.dumps(log.get('actual', {}))}"
+                f"Actual Output={fast_json.dumps(log.get('actual', {}))}"
             )
             formatted.append(entry)
         
@@ -107,7 +107,7 @@ class EfficiencyExpert:
 
         try:
             if isinstance(response, dict):
-                 return json.dumps(response, indent=2)
+                 return fast_json.dumps(response, indent=2)
             else:
                  return str(response)
         except Exception as e:
